@@ -0,0 +1,43 @@
+# export_onnx.py
+"""
+One-shot export of the trained sklearn pipelines to ONNX.
+
+Converts the spam classifier (and the social-engineering classifier when
+present) so they can be served through onnxruntime instead of unpickling
+the full sklearn pipeline per process. Requires skl2onnx:
+
+    pip install skl2onnx onnxruntime
+
+Usage:
+    # from project root
+    python src/export_onnx.py
+"""
+import os
+import joblib
+from pathlib import Path
+
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import StringTensorType
+
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+
+EXPORTS = [
+    # (source artifact, onnx target)
+    (os.getenv("SPAM_MODEL_PATH", os.path.join(MODEL_DIR, "spam_model_v1.joblib")),
+     os.path.join(MODEL_DIR, "spam_model.onnx")),
+    (os.getenv("SOCIAL_MODEL_PATH", os.path.join(MODEL_DIR, "social_model.pkl")),
+     os.path.join(MODEL_DIR, "social_model.onnx")),
+]
+
+for src, dst in EXPORTS:
+    if not Path(src).exists():
+        print(f"⚠️ Skipping {src} (not found)")
+        continue
+    print(f"📦 Converting {src} -> {dst}")
+    clf = joblib.load(src)
+    onnx_model = convert_sklearn(clf, initial_types=[("input", StringTensorType([None]))])
+    with open(dst, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+    print(f"💾 Saved {dst}")
+
+print("Done.")
@@ -1,381 +1,642 @@
-# src/app.py
-"""
-PhishNet — Streamlit demo app (Demo path for attachments)
-
-Features:
-- Fetch latest email via read_gmail.get_latest_email()
-- Spam classification via utils.classify_email()
-- Social engineering detection via utils.classify_social_combined()
-- URL scanning via urlscan.io (submit + poll)
-- Attachment handling: compute SHA256, lookup VirusTotal (by hash) and cache results
-- All HTTP uses a TLSAdapter session to reduce Windows SSL issues
-"""
-import os
-import time
-import tempfile
-import hashlib
-import json
-import streamlit as st
-from bs4 import BeautifulSoup
-import re
-from pathlib import Path
-
-# local modules - make sure these exist in src/
-from read_gmail import get_latest_email
-import utils
-
-# requests + TLSAdapter
-import requests
-import ssl
-from requests.adapters import HTTPAdapter
-from urllib3.poolmanager import PoolManager
-
-# ---------- Config ----------
-st.set_page_config(page_title="PhishNet — Demo (VT lookup + urlscan)", layout="wide")
-
-URLSCAN_API_KEY = os.getenv("URLSCAN_API_KEY")
-URLSCAN_SUBMIT = "https://urlscan.io/api/v1/scan/"
-URLSCAN_RESULT = "https://urlscan.io/api/v1/result/{uuid}/"
-
-VIRUSTOTAL_API_KEY = os.getenv("VIRUSTOTAL_API_KEY")  # free key usage: lookup by hash only
-VT_REPORT_URL = "https://www.virustotal.com/vtapi/v2/file/report"
-
-VT_CACHE_DIR = Path("vt_cache")
-VT_CACHE_DIR.mkdir(exist_ok=True)
-
-URL_REGEX = re.compile(r"https?://[^\s)>\]]+")
-
-# ---------- TLS Adapter session ----------
-class TLSAdapter(HTTPAdapter):
-    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
-        ctx = ssl.create_default_context()
-        # If you still hit handshake errors, uncomment the next line cautiously:
-        # ctx.set_ciphers("DEFAULT@SECLEVEL=1")
-        pool_kwargs['ssl_context'] = ctx
-        return super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
-
-session = requests.Session()
-session.mount("https://", TLSAdapter())
-
-# ---------- helpers ----------
-def safe_render_html(html_text):
-    return BeautifulSoup(html_text or "", "html.parser").get_text()
-
-def extract_unique_urls(text):
-    urls = URL_REGEX.findall(text or "")
-    seen = set()
-    unique = []
-    for u in urls:
-        if u not in seen:
-            seen.add(u)
-            unique.append(u)
-    return unique
-
-def submit_urlscan(url):
-    if not URLSCAN_API_KEY:
-        return {"error": "URLSCAN_API_KEY not set in environment"}
-    headers = {"API-Key": URLSCAN_API_KEY, "Content-Type": "application/json"}
-    payload = {"url": url, "visibility": "public"}
-    try:
-        r = session.post(URLSCAN_SUBMIT, headers=headers, json=payload, timeout=20)
-        if r.status_code in (200, 201):
-            return {"uuid": r.json().get("uuid")}
-        else:
-            try:
-                body = r.json()
-            except Exception:
-                body = r.text
-            return {"error": f"submit failed HTTP {r.status_code}: {body}"}
-    except requests.exceptions.SSLError as e:
-        return {"error": f"SSLError: {e}"}
-    except Exception as e:
-        return {"error": str(e)}
-
-def fetch_urlscan_result(uuid):
-    try:
-        r = session.get(URLSCAN_RESULT.format(uuid=uuid), timeout=20)
-        if r.status_code == 200:
-            return r.json()
-        elif r.status_code == 404:
-            return None
-        else:
-            try:
-                body = r.json()
-            except Exception:
-                body = r.text
-            return {"error": f"HTTP {r.status_code}: {body}"}
-    except requests.exceptions.SSLError as e:
-        return {"error": f"SSLError: {e}"}
-    except Exception as e:
-        return {"error": str(e)}
-
-def poll_urlscan(uuid, timeout=25, poll_interval=2):
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        res = fetch_urlscan_result(uuid)
-        if isinstance(res, dict) and res.get("error"):
-            return {"error": res.get("error")}
-        if res is None:
-            time.sleep(poll_interval)
-            continue
-        return res
-    return {"error": "timeout waiting for urlscan result"}
-
-def verdict_from_urlscan(res):
-    if not isinstance(res, dict):
-        return "Unknown", {}
-    verdicts = res.get("verdicts") or {}
-    overall = verdicts.get("overall") or {}
-    if overall.get("malicious"):
-        return "Malicious ❌", overall
-    if overall.get("suspicious"):
-        return "Suspicious ⚠️", overall
-    return "Safe ✅", overall or res.get("page") or {}
-
-# ---------- VirusTotal lookup by SHA256 (demo path) ----------
-def sha256_bytes(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
-
-def vt_cache_path(sha256: str) -> Path:
-    return VT_CACHE_DIR / f"{sha256}.json"
-
-def vt_lookup_by_hash(sha256: str):
-    cache = vt_cache_path(sha256)
-    if cache.exists():
-        try:
-            return json.loads(cache.read_text(encoding="utf-8"))
-        except Exception:
-            pass
-
-    if not VIRUSTOTAL_API_KEY:
-        return {"error": "VIRUSTOTAL_API_KEY not set (VT lookup unavailable)"}
-
-    params = {"apikey": VIRUSTOTAL_API_KEY, "resource": sha256}
-    try:
-        r = session.get(VT_REPORT_URL, params=params, timeout=20)
-        r.raise_for_status()
-        data = r.json()
-        # cache result (even if 'response_code' == 0)
-        try:
-            cache.write_text(json.dumps(data), encoding="utf-8")
-        except Exception:
-            pass
-        return data
-    except requests.exceptions.SSLError as e:
-        return {"error": f"SSLError: {e}"}
-    except Exception as e:
-        return {"error": str(e)}
-
-# ---------- Streamlit UI ----------
-st.title("📩 PhishNet — Demo (urlscan for URLs, VirusTotal lookup for attachments)")
-col_main, col_side = st.columns([3, 1])
-
-with col_side:
-    st.header("Controls")
-    if st.button("Fetch latest email"):
-        st.session_state["fetched"] = True
-    if st.button("Re-scan links (force)"):
-        st.session_state["force_rescan"] = True
-    st.markdown("---")
-    st.write("Configuration")
-    st.text(f"urlscan key set: {'Yes' if URLSCAN_API_KEY else 'No'}")
-    st.text(f"VirusTotal key set: {'Yes' if VIRUSTOTAL_API_KEY else 'No (lookup disabled)'}")
-    st.caption("Demo mode: attachments are looked up by SHA256 on VirusTotal (free flow).")
-    st.markdown("---")
-    st.write("Notes")
-    st.caption("VT free API cannot upload new files. If no VT record exists, consider manual upload to VT web UI or using other scanners.")
-
-# session state defaults
-if "fetched" not in st.session_state:
-    st.session_state["fetched"] = False
-if "force_rescan" not in st.session_state:
-    st.session_state["force_rescan"] = False
-if "email" not in st.session_state:
-    st.session_state["email"] = None
-if "urlscan_checks" not in st.session_state:
-    st.session_state["urlscan_checks"] = None
-
-# Fetch latest email if requested
-if st.session_state["fetched"] or st.session_state["force_rescan"]:
-    try:
-        latest = get_latest_email()
-        if latest is None:
-            st.warning("No email found. Make sure your email access is configured.")
-            st.session_state["email"] = None
-        else:
-            if len(latest) == 3:
-                sender, subject, body = latest
-                attachments = []
-            else:
-                sender, subject, body, attachments = latest
-            st.session_state["email"] = {"sender": sender, "subject": subject, "body": body, "attachments": attachments}
-            st.session_state["urlscan_checks"] = None
-            st.session_state["force_rescan"] = False
-            st.success("Latest email fetched.")
-    except Exception as e:
-        st.error(f"Error fetching email: {e}")
-        st.session_state["email"] = None
-    st.session_state["fetched"] = False
-
-email = st.session_state.get("email")
-if not email:
-    st.info("No email loaded. Click 'Fetch latest email' to begin.")
-    st.stop()
-
-# ---------- Main column: email + classification ----------
-with col_main:
-    st.subheader("Email")
-    st.markdown(f"**From:** {email.get('sender')}")
-    st.markdown(f"**Subject:** {email.get('subject') or '(no subject)'}")
-    body_text = safe_render_html(email.get("body") or "")
-    st.text_area("Body", value=body_text, height=220)
-
-    st.markdown("---")
-    st.subheader("Classification")
-
-    # Spam
-    spam_label = utils.classify_email(email.get("subject"), email.get("body"))
-    if spam_label.startswith("SPAM"):
-        st.error(f"🔎 Spam Classification: {spam_label}")
-    elif spam_label.startswith("HAM"):
-        st.success(f"🔎 Spam Classification: {spam_label}")
-    else:
-        st.warning(f"🔎 Spam Classification: {spam_label}")
-
-    # Social combined
-    combined = utils.classify_social_combined(email.get("body") or "")
-    model_prob = combined.get("model_prob")
-    rule_score = combined.get("rule_score", 0.0)
-    combined_prob = combined.get("combined_prob", 0.0)
-    threshold = combined.get("threshold", getattr(utils, "SOCIAL_THRESHOLD", 0.45))
-    label = combined.get("label", "UNKNOWN")
-    triggers = combined.get("triggers", [])
-
-    st.markdown("**Social Engineering (combined)**")
-    cols = st.columns([2, 2, 2])
-    with cols[0]:
-        if model_prob is None:
-            st.write("Model prob: N/A")
-        else:
-            st.write(f"Model prob: {model_prob:.2f}")
-            st.progress(min(1.0, max(0.0, model_prob)))
-    with cols[1]:
-        st.write(f"Rule score: {rule_score:.2f}")
-        st.progress(min(1.0, max(0.0, rule_score)))
-    with cols[2]:
-        st.write(f"Combined: {combined_prob:.2f} (thr {threshold:.2f})")
-        st.progress(min(1.0, max(0.0, combined_prob)))
-
-    if "Attack" in label:
-        st.error(f"🎭 Final decision: {label}")
-    elif "No Attack" in label:
-        st.success(f"🎭 Final decision: {label}")
-    else:
-        st.info(f"🎭 Final decision: {label}")
-
-    if triggers:
-        st.markdown("**Rule triggers**")
-        for t in triggers:
-            st.write(f"- {t}")
-    else:
-        st.write("**Rule triggers:** none")
-
-# ---------- Side column: URLs + Attachments ----------
-with col_side:
-    st.subheader("Links")
-    urls = extract_unique_urls(email.get("body") or "")
-    if not urls:
-        st.write("No links found.")
-    else:
-        st.write(f"{len(urls)} link(s) found (unique):")
-        for u in urls:
-            st.write(f"- {u}")
-
-        if st.button("Check all links with urlscan.io"):
-            if not URLSCAN_API_KEY:
-                st.error("URLSCAN_API_KEY not set. Please set it in environment.")
-            else:
-                st.session_state["urlscan_checks"] = []
-                with st.spinner("Submitting links to urlscan.io and polling results..."):
-                    for u in urls:
-                        submit_res = submit_urlscan(u)
-                        if submit_res.get("error"):
-                            st.session_state["urlscan_checks"].append((u, {"error": submit_res.get("error")}))
-                            continue
-                        uuid = submit_res.get("uuid")
-                        if not uuid:
-                            st.session_state["urlscan_checks"].append((u, {"error": "no uuid returned"}))
-                            continue
-                        res = poll_urlscan(uuid, timeout=25, poll_interval=2)
-                        if isinstance(res, dict) and res.get("error"):
-                            st.session_state["urlscan_checks"].append((u, {"error": res.get("error")}))
-                            continue
-                        verdict_label, detail = verdict_from_urlscan(res)
-                        st.session_state["urlscan_checks"].append((u, {"verdict": verdict_label, "detail": detail, "raw": res}))
-                st.success("Link checks complete.")
-
-    if st.session_state.get("urlscan_checks"):
-        st.markdown("---")
-        st.subheader("urlscan.io results")
-        for u, res in st.session_state["urlscan_checks"]:
-            if res.get("error"):
-                st.write(f"- {u} → Error: {res.get('error')}")
-            else:
-                verdict = res.get("verdict", "Unknown")
-                detail = res.get("detail", {})
-                if "Safe" in verdict:
-                    st.write(f"- {u} → ✅ {verdict}")
-                elif "Malicious" in verdict:
-                    st.write(f"- {u} → 🚨 {verdict}")
-                elif "Suspicious" in verdict:
-                    st.write(f"- {u} → ⚠️ {verdict}")
-                else:
-                    st.write(f"- {u} → {verdict}")
-                with st.expander("Show details"):
-                    st.json(detail)
-
-    st.markdown("---")
-    st.subheader("Attachments (demo flow)")
-    attachments = email.get("attachments") or []
-    if not attachments:
-        st.write("No attachments.")
-    else:
-        for idx, (fname, data) in enumerate(attachments):
-            st.write(f"- {fname} ({len(data) if data else 0} bytes)")
-            # download
-            try:
-                st.download_button(label=f"Download {fname}", data=data, file_name=fname)
-            except Exception:
-                pass
-
-            # Compute SHA256 and show it
-            if data:
-                sha = sha256_bytes(data)
-                st.write(f"SHA256: `{sha}`")
-                cachep = vt_cache_path(sha)
-                if cachep.exists():
-                    st.info("Cached VirusTotal lookup available for this file.")
-                # Button to lookup on VirusTotal by hash
-                key = f"vt_lookup_{idx}"
-                if st.button(f"Lookup on VirusTotal (by SHA256): {fname}", key=key):
-                    with st.spinner("Querying VirusTotal by SHA256..."):
-                        vt_resp = vt_lookup_by_hash(sha)
-                    if vt_resp.get("error"):
-                        st.error(f"VT lookup error: {vt_resp.get('error')}")
-                    else:
-                        rc = vt_resp.get("response_code")
-                        if rc == 1:
-                            positives = vt_resp.get("positives", 0)
-                            total = vt_resp.get("total", 0)
-                            st.write(f"🔎 VirusTotal: {positives}/{total} engines flagged this file.")
-                            with st.expander("Show VirusTotal report JSON"):
-                                st.json(vt_resp)
-                        else:
-                            st.warning("No VirusTotal record for this file (response_code == 0).")
-                            st.write("Free API cannot upload new files. Options:")
-                            st.write("- Manually upload the file to VirusTotal web UI to get a report.")
-                            st.write("- Use another scanning provider (Hybrid-Analysis, MetaDefender) if you have an API key.")
-                            st.write(f"Cached SHA256 saved at: `{cachep}` (VT lookup stored here if you run a lookup later).")
-
-st.markdown("---")
-st.caption("Demo mode: Attachments lookup via VirusTotal by hash (free API). For fresh file scans, use a paid VT key or alternative scanner. URL scans use urlscan.io.")
+# src/app.py
+"""
+PhishNet — Streamlit demo app (Demo path for attachments)
+
+Features:
+- Fetch latest email via read_gmail.get_latest_email()
+- Spam classification via utils.classify_email()
+- Social engineering detection via utils.classify_social_combined()
+- URL scanning via urlscan.io (submit + poll)
+- Attachment handling: compute SHA256, lookup VirusTotal (by hash) and cache results
+- All HTTP uses a TLSAdapter session to reduce Windows SSL issues
+"""
+import os
+import time
+import tempfile
+import hashlib
+import sqlite3
+import json
+import html
+import asyncio
+import streamlit as st
+from bs4 import BeautifulSoup
+import re
+from pathlib import Path
+
+# orjson is a C JSON codec, several times faster than stdlib json; fall back
+# transparently when it isn't installed (both helpers deal in bytes)
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    _dumps = lambda o: json.dumps(o, separators=(",", ":")).encode()
+    _loads = json.loads
+
+# local modules - make sure these exist in src/
+from read_gmail import get_latest_email
+import utils
+
+# requests + TLSAdapter
+import requests
+import aiohttp
+import ssl
+from requests.adapters import HTTPAdapter
+from urllib3.poolmanager import PoolManager
+
+# ---------- Config ----------
+st.set_page_config(page_title="PhishNet — Demo (VT lookup + urlscan)", layout="wide")
+
+URLSCAN_API_KEY = os.getenv("URLSCAN_API_KEY")
+URLSCAN_SUBMIT = "https://urlscan.io/api/v1/scan/"
+URLSCAN_RESULT = "https://urlscan.io/api/v1/result/{uuid}/"
+
+VIRUSTOTAL_API_KEY = os.getenv("VIRUSTOTAL_API_KEY")  # free key usage: lookup by hash only
+VT_FILE_URL = "https://www.virustotal.com/api/v3/files/{sha256}"
+
+VT_CACHE_DIR = Path("vt_cache")
+VT_CACHE_DIR.mkdir(exist_ok=True)
+
+URLSCAN_CACHE_DIR = Path("urlscan_cache")
+URLSCAN_CACHE_DIR.mkdir(exist_ok=True)
+
+ATTACHMENT_SAVE_FOLDER = os.getenv("ATTACHMENT_SAVE_FOLDER", "attachments")
+os.makedirs(ATTACHMENT_SAVE_FOLDER, exist_ok=True)
+
+# in-flight urlscan submissions persisted here so a restart mid-poll can
+# resume instead of resubmitting (and burning quota)
+URLSCAN_PENDING_DB = os.getenv("URLSCAN_PENDING_DB", "urlscan_pending.db")
+URLSCAN_PENDING_MAX_AGE = 300  # seconds; older submissions are considered stale
+URLSCAN_CACHE_TTL = 24 * 3600  # recurring URLs (signatures, promos) skip re-scanning for a day
+
+# explicit ASCII URL charset + re.ASCII keeps the engine off the Unicode tables;
+# parens/brackets stay excluded so links in prose ("see https://x.y)") don't swallow them
+URL_REGEX = re.compile(r"https?://[\w\-._~:/?#@!$&'*+,;=%]+", re.ASCII)
+
+# ---------- TLS Adapter session ----------
+class TLSAdapter(HTTPAdapter):
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        ctx = ssl.create_default_context()
+        # If you still hit handshake errors, uncomment the next line cautiously:
+        # ctx.set_ciphers("DEFAULT@SECLEVEL=1")
+        pool_kwargs['ssl_context'] = ctx
+        return super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+
+session = requests.Session()
+# pooled adapter: keep connections alive so repeated VT lookups skip the TLS handshake
+session.mount("https://", TLSAdapter(pool_connections=32, pool_maxsize=32))
+
+# selectolax (C MyHTML bindings) strips tags an order of magnitude faster
+# than BeautifulSoup; optional, BS stays as the fallback
+try:
+    from selectolax.parser import HTMLParser as _SelectolaxParser
+except ImportError:
+    _SelectolaxParser = None
+
+# ---------- helpers ----------
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+
+def fast_html_to_text(s):
+    # regex tier for tiny HTML envelopes: strip tags, decode entities, squeeze whitespace
+    return _WS_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", s))).strip()
+
+def safe_render_html(html_text):
+    s = html_text or ""
+    if "<" not in s:
+        # plaintext body: nothing to strip, just decode any stray entities
+        return html.unescape(s) if "&" in s else s
+    if len(s) < 8192 and s.count("<") < 50:
+        # small body with a handful of tags: a full parser is overkill
+        return fast_html_to_text(s)
+    if _SelectolaxParser is not None:
+        try:
+            return _SelectolaxParser(s).text(separator=" ", strip=True)
+        except Exception:
+            pass
+    try:
+        # lxml is the C-backed parser, several times faster than html.parser
+        return BeautifulSoup(s, "lxml").get_text(" ", strip=True)
+    except Exception:
+        return BeautifulSoup(s, "html.parser").get_text(" ", strip=True)
+
+def extract_unique_urls(text):
+    # dict.fromkeys dedupes in one pass while preserving first-seen order
+    return list(dict.fromkeys(URL_REGEX.findall(text or "")))
+
+def email_fingerprint(sender, subject, body):
+    # 8-byte blake2b digest: integer-cheap to compare and bounded in size,
+    # unlike keeping full sender/subject strings around
+    key = f"{sender}|{subject}|{body or ''}".encode("utf-8", "ignore")
+    return hashlib.blake2b(key, digest_size=8).hexdigest()
+
+def preprocess_email(subject, body):
+    """
+    One shared pass over the email: strip HTML once and extract URLs once,
+    so the spam model, the social classifier and the links panel don't each
+    re-walk the same body.
+    """
+    raw = body or ""
+    return {
+        "subject": subject or "",
+        "text": safe_render_html(raw),
+        "urls": extract_unique_urls(raw),
+    }
+
+async def submit_urlscan(http, url):
+    if not URLSCAN_API_KEY:
+        return {"error": "URLSCAN_API_KEY not set in environment"}
+    payload = _dumps({"url": url, "visibility": "public"})
+    try:
+        async with http.post(URLSCAN_SUBMIT, data=payload,
+                             headers={"Content-Type": "application/json"},
+                             timeout=aiohttp.ClientTimeout(total=20)) as r:
+            if r.status in (200, 201):
+                data = _loads(await r.read())
+                return {"uuid": data.get("uuid")}
+            else:
+                try:
+                    body = await r.json()
+                except Exception:
+                    body = await r.text()
+                return {"error": f"submit failed HTTP {r.status}: {body}"}
+    except Exception as e:
+        return {"error": str(e)}
+
+async def fetch_urlscan_result(http, uuid):
+    try:
+        async with http.get(URLSCAN_RESULT.format(uuid=uuid), timeout=aiohttp.ClientTimeout(total=20)) as r:
+            if r.status == 200:
+                return _loads(await r.read())
+            elif r.status == 404:
+                return None
+            else:
+                try:
+                    body = await r.json()
+                except Exception:
+                    body = await r.text()
+                return {"error": f"HTTP {r.status}: {body}"}
+    except Exception as e:
+        return {"error": str(e)}
+
+def _pending_conn():
+    conn = sqlite3.connect(URLSCAN_PENDING_DB, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS pending(uuid TEXT PRIMARY KEY, url TEXT, ts REAL)")
+    return conn
+
+def pending_record(uuid, url):
+    try:
+        with _pending_conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO pending VALUES (?, ?, ?)", (uuid, url, time.time()))
+    except Exception:
+        pass
+
+def pending_forget(uuid):
+    try:
+        with _pending_conn() as conn:
+            conn.execute("DELETE FROM pending WHERE uuid = ?", (uuid,))
+    except Exception:
+        pass
+
+def pending_resume(urls, max_age=URLSCAN_PENDING_MAX_AGE):
+    """Map url -> uuid for recent still-pending submissions covering `urls`."""
+    try:
+        with _pending_conn() as conn:
+            cutoff = time.time() - max_age
+            conn.execute("DELETE FROM pending WHERE ts <= ?", (cutoff,))
+            rows = conn.execute("SELECT uuid, url FROM pending WHERE ts > ?", (cutoff,)).fetchall()
+        wanted = set(urls)
+        return {url: uuid for uuid, url in rows if url in wanted}
+    except Exception:
+        return {}
+
+def urlscan_cache_path(url: str) -> Path:
+    return URLSCAN_CACHE_DIR / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+def urlscan_cached(url, ttl=URLSCAN_CACHE_TTL):
+    cache = urlscan_cache_path(url)
+    try:
+        if cache.exists() and cache.stat().st_mtime > time.time() - ttl:
+            return _loads(cache.read_bytes())
+    except Exception:
+        pass
+    return None
+
+def urlscan_cache_store(url, result):
+    # only cache real verdicts, never transient errors
+    if not result or result.get("error"):
+        return
+    try:
+        payload = {"verdict": result.get("verdict"), "detail": result.get("detail")}
+        urlscan_cache_path(url).write_bytes(_dumps(payload))
+    except Exception:
+        pass
+
+def urlscan_result_pending(res):
+    # a 200 can land before the verdict pipeline finishes; until
+    # verdicts.overall.hasVerdicts flips true the scan is still processing
+    # and rendering it would claim "Safe" on incomplete data
+    return not (((res.get("verdicts") or {}).get("overall") or {}).get("hasVerdicts"))
+
+async def scan_urls_with_urlscan(urls, timeout=90, first_wait=15, poll_interval=5):
+    """
+    Submit all URLs concurrently, then poll all outstanding UUIDs together.
+    Cached verdicts (see urlscan_cached) are returned without any network call.
+    Returns a list of (url, result_dict) in the same order as `urls`.
+    """
+    results = {}
+    to_scan = []
+    for u in urls:
+        local = utils.prefilter_url(u)
+        if local == "Malicious":
+            results[u] = {"verdict": "Malicious ❌", "detail": {"source": "local blocklist"}}
+            continue
+        if local == "Safe":
+            results[u] = {"verdict": "Safe ✅", "detail": {"source": "local allowlist"}}
+            continue
+        cached = urlscan_cached(u)
+        if cached is not None:
+            results[u] = cached
+        else:
+            to_scan.append(u)
+    if not to_scan:
+        return [(u, results[u]) for u in urls]
+
+    connector = aiohttp.TCPConnector(limit=32)
+    # API key set once on the session so per-call header dicts aren't rebuilt
+    headers = {"API-Key": URLSCAN_API_KEY} if URLSCAN_API_KEY else {}
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as http:
+        pending = {}  # uuid -> url
+        # resume submissions from a previous (possibly restarted) process first
+        resumed = pending_resume(to_scan)
+        for u, uid in resumed.items():
+            pending[uid] = u
+        need_submit = [u for u in to_scan if u not in resumed]
+        submits = await asyncio.gather(*[submit_urlscan(http, u) for u in need_submit])
+        for u, sub in zip(need_submit, submits):
+            if sub.get("error"):
+                results[u] = {"error": sub["error"]}
+            elif not sub.get("uuid"):
+                results[u] = {"error": "no uuid returned"}
+            else:
+                pending[sub["uuid"]] = u
+                pending_record(sub["uuid"], u)
+
+        deadline = time.time() + timeout
+        if pending:
+            # scans are rarely ready before ~10-15s; polling earlier just burns
+            # round-trips on guaranteed 404s
+            await asyncio.sleep(min(first_wait, timeout))
+        partial = {}  # uuid -> last 200 result still waiting on verdicts
+        while pending and time.time() < deadline:
+            uuids = list(pending.keys())
+            fetched = await asyncio.gather(*[fetch_urlscan_result(http, uid) for uid in uuids])
+            for uid, res in zip(uuids, fetched):
+                if res is None:
+                    continue  # not ready yet, poll again next round
+                if not res.get("error") and urlscan_result_pending(res):
+                    partial[uid] = res
+                    continue  # 200 before the verdict pipeline finished
+                u = pending.pop(uid)
+                pending_forget(uid)
+                if isinstance(res, dict) and res.get("error"):
+                    results[u] = {"error": res.get("error")}
+                else:
+                    verdict_label, detail = verdict_from_urlscan(res)
+                    results[u] = {"verdict": verdict_label, "detail": detail, "raw": res}
+                    urlscan_cache_store(u, results[u])
+            if pending:
+                await asyncio.sleep(poll_interval)
+
+        # timed-out UUIDs stay in the DB so the next scan resumes them; if the
+        # scan completed but never produced verdicts, report what we have
+        # instead of a timeout error
+        for uid, u in pending.items():
+            res = partial.get(uid)
+            if res is not None:
+                pending_forget(uid)
+                verdict_label, detail = verdict_from_urlscan(res)
+                results[u] = {"verdict": verdict_label, "detail": detail, "raw": res}
+            else:
+                results[u] = {"error": "timeout waiting for urlscan result"}
+        return [(u, results[u]) for u in urls]
+
+def scan_urls(urls, timeout=90, first_wait=15, poll_interval=5):
+    # sync wrapper so callers don't need to manage the event loop
+    return asyncio.run(scan_urls_with_urlscan(urls, timeout=timeout, first_wait=first_wait, poll_interval=poll_interval))
+
+def verdict_from_urlscan(res):
+    if not isinstance(res, dict):
+        return "Unknown", {}
+    verdicts = res.get("verdicts") or {}
+    overall = verdicts.get("overall") or {}
+    if overall.get("malicious"):
+        return "Malicious ❌", overall
+    if overall.get("suspicious"):
+        return "Suspicious ⚠️", overall
+    return "Safe ✅", overall or res.get("page") or {}
+
+# ---------- VirusTotal lookup by SHA256 (demo path) ----------
+def sha256_bytes(data: bytes) -> str:
+    h = hashlib.sha256()
+    h.update(memoryview(data))  # avoid copying the buffer before hashing
+    return h.hexdigest()
+
+def sha256_path(path) -> str:
+    # stream from disk so the attachment bytes don't need to stay in memory
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def save_and_hash(filename, data):
+    """Save attachment bytes under ATTACHMENT_SAVE_FOLDER and SHA-256 them.
+
+    Reads the folder once with os.scandir instead of calling os.path.exists
+    per candidate name, so resolving `invoice.pdf` -> `invoice_7.pdf` costs
+    one directory read plus in-memory set lookups. The write and the hash
+    share a single chunked pass over the buffer, so multi-MB attachments
+    are walked once instead of twice. Returns (path, sha256_hexdigest).
+    """
+    with os.scandir(ATTACHMENT_SAVE_FOLDER) as it:
+        existing = {e.name for e in it}
+    base, ext = os.path.splitext(filename or "attachment.bin")
+    cand = filename or "attachment.bin"
+    i = 1
+    while cand in existing:
+        cand = f"{base}_{i}{ext}"
+        i += 1
+    path = os.path.join(ATTACHMENT_SAVE_FOLDER, cand)
+    h = hashlib.sha256()
+    chunk = 1 << 20
+    mv = memoryview(data)
+    with open(path, "wb", buffering=chunk) as f:
+        for off in range(0, len(mv), chunk):
+            piece = mv[off:off + chunk]
+            f.write(piece)
+            h.update(piece)
+    return path, h.hexdigest()
+
+_VT_MEMO = {}  # process-lifetime memo on top of the disk cache
+
+def vt_cache_path(sha256: str) -> Path:
+    return VT_CACHE_DIR / f"{sha256}.json"
+
+def vt_lookup_by_hash(sha256: str):
+    hit = _VT_MEMO.get(sha256)
+    if hit is not None:
+        return hit
+
+    cache = vt_cache_path(sha256)
+    if cache.exists():
+        try:
+            data = _loads(cache.read_bytes())
+            _VT_MEMO[sha256] = data
+            return data
+        except Exception:
+            pass
+
+    if not VIRUSTOTAL_API_KEY:
+        return {"error": "VIRUSTOTAL_API_KEY not set (VT lookup unavailable)"}
+
+    try:
+        r = session.get(VT_FILE_URL.format(sha256=sha256),
+                        headers={"x-apikey": VIRUSTOTAL_API_KEY}, timeout=20)
+        if r.status_code == 404:
+            data = {"response_code": 0}
+        else:
+            r.raise_for_status()
+            report = _loads(r.content)
+            stats = (report.get("data", {}).get("attributes", {}) or {}).get("last_analysis_stats", {}) or {}
+            # keep the v2-style summary fields the UI reads, with the full v3 report attached
+            data = {
+                "response_code": 1,
+                "positives": stats.get("malicious", 0) + stats.get("suspicious", 0),
+                "total": sum(stats.values()) if stats else 0,
+                "v3": report,
+            }
+        # cache result (even if 'response_code' == 0)
+        try:
+            cache.write_bytes(_dumps(data))
+        except Exception:
+            pass
+        _VT_MEMO[sha256] = data
+        return data
+    except requests.exceptions.SSLError as e:
+        return {"error": f"SSLError: {e}"}
+    except Exception as e:
+        return {"error": str(e)}
+
+# ---------- Streamlit UI ----------
+st.title("📩 PhishNet — Demo (urlscan for URLs, VirusTotal lookup for attachments)")
+col_main, col_side = st.columns([3, 1])
+
+with col_side:
+    st.header("Controls")
+    if st.button("Fetch latest email"):
+        st.session_state["fetched"] = True
+    if st.button("Re-scan links (force)"):
+        st.session_state["force_rescan"] = True
+    st.markdown("---")
+    st.write("Configuration")
+    st.text(f"urlscan key set: {'Yes' if URLSCAN_API_KEY else 'No'}")
+    st.text(f"VirusTotal key set: {'Yes' if VIRUSTOTAL_API_KEY else 'No (lookup disabled)'}")
+    st.caption("Demo mode: attachments are looked up by SHA256 on VirusTotal (free flow).")
+    st.markdown("---")
+    st.write("Notes")
+    st.caption("VT free API cannot upload new files. If no VT record exists, consider manual upload to VT web UI or using other scanners.")
+
+# session state defaults
+if "fetched" not in st.session_state:
+    st.session_state["fetched"] = False
+if "force_rescan" not in st.session_state:
+    st.session_state["force_rescan"] = False
+if "email" not in st.session_state:
+    st.session_state["email"] = None
+if "urlscan_checks" not in st.session_state:
+    st.session_state["urlscan_checks"] = None
+
+# Fetch latest email if requested
+if st.session_state["fetched"] or st.session_state["force_rescan"]:
+    try:
+        latest = get_latest_email()
+        if latest is None:
+            st.warning("No email found. Make sure your email access is configured.")
+            st.session_state["email"] = None
+        else:
+            if len(latest) == 3:
+                sender, subject, body = latest
+                attachments = []
+            else:
+                sender, subject, body, attachments = latest
+            fp = email_fingerprint(sender, subject, body)
+            prev = st.session_state.get("email") or {}
+            same_email = prev.get("fp") == fp
+            st.session_state["email"] = {"sender": sender, "subject": subject, "body": body,
+                                         "attachments": attachments, "fp": fp}
+            if st.session_state["force_rescan"] or not same_email:
+                # only throw away scan results when the email actually changed
+                st.session_state["urlscan_checks"] = None
+            st.session_state["force_rescan"] = False
+            st.success("Latest email fetched." if not same_email else "Latest email unchanged — kept existing scan results.")
+    except Exception as e:
+        st.error(f"Error fetching email: {e}")
+        st.session_state["email"] = None
+    st.session_state["fetched"] = False
+
+email = st.session_state.get("email")
+if not email:
+    st.info("No email loaded. Click 'Fetch latest email' to begin.")
+    st.stop()
+
+# single shared pass over the body (HTML strip + URL extraction)
+pre = preprocess_email(email.get("subject"), email.get("body"))
+
+# ---------- Main column: email + classification ----------
+with col_main:
+    st.subheader("Email")
+    st.markdown(f"**From:** {email.get('sender')}")
+    st.markdown(f"**Subject:** {email.get('subject') or '(no subject)'}")
+    body_text = pre["text"]
+    st.text_area("Body", value=body_text, height=220)
+
+    st.markdown("---")
+    st.subheader("Classification")
+
+    # Spam
+    spam_label = utils.classify_email(pre["subject"], pre["text"])
+    if spam_label.startswith("SPAM"):
+        st.error(f"🔎 Spam Classification: {spam_label}")
+    elif spam_label.startswith("HAM"):
+        st.success(f"🔎 Spam Classification: {spam_label}")
+    else:
+        st.warning(f"🔎 Spam Classification: {spam_label}")
+
+    # Social combined
+    combined = utils.classify_social_combined(pre["text"])
+    model_prob = combined.get("model_prob")
+    rule_score = combined.get("rule_score", 0.0)
+    combined_prob = combined.get("combined_prob", 0.0)
+    threshold = combined.get("threshold", getattr(utils, "SOCIAL_THRESHOLD", 0.45))
+    label = combined.get("label", "UNKNOWN")
+    triggers = combined.get("triggers", [])
+
+    st.markdown("**Social Engineering (combined)**")
+    cols = st.columns([2, 2, 2])
+    with cols[0]:
+        if model_prob is None:
+            st.write("Model prob: N/A")
+        else:
+            st.write(f"Model prob: {model_prob:.2f}")
+            st.progress(min(1.0, max(0.0, model_prob)))
+    with cols[1]:
+        st.write(f"Rule score: {rule_score:.2f}")
+        st.progress(min(1.0, max(0.0, rule_score)))
+    with cols[2]:
+        st.write(f"Combined: {combined_prob:.2f} (thr {threshold:.2f})")
+        st.progress(min(1.0, max(0.0, combined_prob)))
+
+    if "Attack" in label:
+        st.error(f"🎭 Final decision: {label}")
+    elif "No Attack" in label:
+        st.success(f"🎭 Final decision: {label}")
+    else:
+        st.info(f"🎭 Final decision: {label}")
+
+    if triggers:
+        st.markdown("**Rule triggers**")
+        for t in triggers:
+            st.write(f"- {t}")
+    else:
+        st.write("**Rule triggers:** none")
+
+# ---------- Side column: URLs + Attachments ----------
+with col_side:
+    st.subheader("Links")
+    urls = pre["urls"]
+    if not urls:
+        st.write("No links found.")
+    else:
+        st.write(f"{len(urls)} link(s) found (unique):")
+        for u in urls:
+            st.write(f"- {u}")
+
+        if st.button("Check all links with urlscan.io"):
+            if not URLSCAN_API_KEY:
+                st.error("URLSCAN_API_KEY not set. Please set it in environment.")
+            else:
+                with st.spinner("Submitting links to urlscan.io and polling results..."):
+                    st.session_state["urlscan_checks"] = scan_urls(urls)
+                st.success("Link checks complete.")
+
+    if st.session_state.get("urlscan_checks"):
+        st.markdown("---")
+        st.subheader("urlscan.io results")
+        for u, res in st.session_state["urlscan_checks"]:
+            if res.get("error"):
+                st.write(f"- {u} → Error: {res.get('error')}")
+            else:
+                verdict = res.get("verdict", "Unknown")
+                detail = res.get("detail", {})
+                if "Safe" in verdict:
+                    st.write(f"- {u} → ✅ {verdict}")
+                elif "Malicious" in verdict:
+                    st.write(f"- {u} → 🚨 {verdict}")
+                elif "Suspicious" in verdict:
+                    st.write(f"- {u} → ⚠️ {verdict}")
+                else:
+                    st.write(f"- {u} → {verdict}")
+                with st.expander("Show details"):
+                    st.json(detail)
+
+    st.markdown("---")
+    st.subheader("Attachments (demo flow)")
+    attachments = email.get("attachments") or []
+    if not attachments:
+        st.write("No attachments.")
+    else:
+        for idx, (fname, data) in enumerate(attachments):
+            st.write(f"- {fname} ({len(data) if data else 0} bytes)")
+            # download
+            try:
+                st.download_button(label=f"Download {fname}", data=data, file_name=fname)
+            except Exception:
+                pass
+
+            if data and st.button(f"Save to disk: {fname}", key=f"save_{idx}"):
+                try:
+                    saved, saved_sha = save_and_hash(fname, data)
+                    st.success(f"Saved to `{saved}` (SHA256 `{saved_sha}`)")
+                except Exception as e:
+                    st.error(f"Could not save attachment: {e}")
+
+            # Compute SHA256 and show it
+            if data:
+                sha = sha256_bytes(data)
+                st.write(f"SHA256: `{sha}`")
+                cachep = vt_cache_path(sha)
+                if cachep.exists():
+                    st.info("Cached VirusTotal lookup available for this file.")
+                # Button to lookup on VirusTotal by hash
+                key = f"vt_lookup_{idx}"
+                if st.button(f"Lookup on VirusTotal (by SHA256): {fname}", key=key):
+                    with st.spinner("Querying VirusTotal by SHA256..."):
+                        vt_resp = vt_lookup_by_hash(sha)
+                    if vt_resp.get("error"):
+                        st.error(f"VT lookup error: {vt_resp.get('error')}")
+                    else:
+                        rc = vt_resp.get("response_code")
+                        if rc == 1:
+                            positives = vt_resp.get("positives", 0)
+                            total = vt_resp.get("total", 0)
+                            st.write(f"🔎 VirusTotal: {positives}/{total} engines flagged this file.")
+                            with st.expander("Show VirusTotal report JSON"):
+                                st.json(vt_resp)
+                        else:
+                            st.warning("No VirusTotal record for this file (response_code == 0).")
+                            st.write("Free API cannot upload new files. Options:")
+                            st.write("- Manually upload the file to VirusTotal web UI to get a report.")
+                            st.write("- Use another scanning provider (Hybrid-Analysis, MetaDefender) if you have an API key.")
+                            st.write(f"Cached SHA256 saved at: `{cachep}` (VT lookup stored here if you run a lookup later).")
+
+st.markdown("---")
+st.caption("Demo mode: Attachments lookup via VirusTotal by hash (free API). For fresh file scans, use a paid VT key or alternative scanner. URL scans use urlscan.io.")
@@ -1,234 +1,186 @@
-# read_gmail.py
-# Fetch latest Gmail message: (sender, subject, body_text, attachments)
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-import base64
-from bs4 import BeautifulSoup
-
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
-
-def _get_service(token_path='token.json'):
-    """
-    Load credentials from token.json (created by OAuth flow) and build Gmail service.
-    """
-    creds = Credentials.from_authorized_user_file(token_path, SCOPES)
-    service = build('gmail', 'v1', credentials=creds)
-    return service
-
-def _get_text_from_part(part):
-    data = part.get('body', {}).get('data')
-    if not data:
-        return ''
-    text = base64.urlsafe_b64decode(data.encode('utf-8')).decode('utf-8', errors='ignore')
-    return text
-
-def _extract_body_from_payload(payload):
-    # Try payload.body -> parts -> nested parts
-    if payload.get('body', {}).get('data'):
-        return _get_text_from_part(payload)
-    parts = payload.get('parts') or []
-    texts = []
-    for part in parts:
-        mime = part.get('mimeType', '')
-        if mime == 'text/plain' and part.get('body', {}).get('data'):
-            texts.append(_get_text_from_part(part))
-        elif mime == 'text/html' and part.get('body', {}).get('data'):
-            html_txt = _get_text_from_part(part)
-            texts.append(BeautifulSoup(html_txt, "html.parser").get_text())
-        else:
-            # nested parts
-            subparts = part.get('parts') or []
-            for sp in subparts:
-                if sp.get('body', {}).get('data'):
-                    if sp.get('mimeType') == 'text/plain':
-                        texts.append(_get_text_from_part(sp))
-                    elif sp.get('mimeType') == 'text/html':
-                        html_txt = _get_text_from_part(sp)
-                        texts.append(BeautifulSoup(html_txt, "html.parser").get_text())
-    return "\n".join(texts).strip()
-
-def _collect_attachments(service, user_id, msg):
-    """
-    Return list of (filename, bytes) for attachments in the message.
-    """
-    attachments = []
-    payload = msg.get('payload', {})
-    parts = payload.get('parts') or []
-    for part in parts:
-        filename = part.get('filename')
-        body = part.get('body', {})
-        if filename and (body.get('attachmentId') or body.get('data')):
-            attachment_data = None
-            if body.get('attachmentId'):
-                att_id = body['attachmentId']
-                att = service.users().messages().attachments().get(userId=user_id, messageId=msg['id'], id=att_id).execute()
-                data = att.get('data')
-                if data:
-                    attachment_data = base64.urlsafe_b64decode(data.encode('utf-8'))
-            elif body.get('data'):
-                attachment_data = base64.urlsafe_b64decode(body['data'].encode('utf-8'))
-            if attachment_data is not None:
-                attachments.append((filename, attachment_data))
-        # nested parts
-        if part.get('parts'):
-            for sp in part.get('parts'):
-                fn = sp.get('filename')
-                b = sp.get('body', {})
-                if fn and (b.get('attachmentId') or b.get('data')):
-                    attachment_data = None
-                    if b.get('attachmentId'):
-                        att_id = b['attachmentId']
-                        att = service.users().messages().attachments().get(userId=user_id, messageId=msg['id'], id=att_id).execute()
-                        data = att.get('data')
-                        if data:
-                            attachment_data = base64.urlsafe_b64decode(data.encode('utf-8'))
-                    elif b.get('data'):
-                        attachment_data = base64.urlsafe_b64decode(b['data'].encode('utf-8'))
-                    if attachment_data is not None:
-                        attachments.append((fn, attachment_data))
-    return attachments
-
-def get_latest_email(token_path='token.json'):
-    """
-    Fetch the most recent email.
-    Returns: (sender, subject, body_text, attachments)
-      - attachments: list of (filename, bytes). Empty list if none.
-    """
-    service = _get_service(token_path)
-    res = service.users().messages().list(userId='me', maxResults=1).execute()
-    msgs = res.get('messages', [])
-    if not msgs:
-        return None
-
-    msg_id = msgs[0]['id']
-    msg = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
-
-    headers = msg.get('payload', {}).get('headers', [])
-    subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), "(No Subject)")
-    sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), "(Unknown Sender)")
-
-    body = _extract_body_from_payload(msg.get('payload', {}))
-    if not body:
-        # fallback to snippet
-        body = msg.get('snippet', '')
-
-    attachments = _collect_attachments(service, 'me', msg)
-
-    return sender, subject, body, attachments
-# read_gmail.py
-# Fetch latest Gmail message: (sender, subject, body_text, attachments)
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-import base64
-from bs4 import BeautifulSoup
-
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
-
-def _get_service(token_path='token.json'):
-    """
-    Load credentials from token.json (created by OAuth flow) and build Gmail service.
-    """
-    creds = Credentials.from_authorized_user_file(token_path, SCOPES)
-    service = build('gmail', 'v1', credentials=creds)
-    return service
-
-def _get_text_from_part(part):
-    data = part.get('body', {}).get('data')
-    if not data:
-        return ''
-    text = base64.urlsafe_b64decode(data.encode('utf-8')).decode('utf-8', errors='ignore')
-    return text
-
-def _extract_body_from_payload(payload):
-    # Try payload.body -> parts -> nested parts
-    if payload.get('body', {}).get('data'):
-        return _get_text_from_part(payload)
-    parts = payload.get('parts') or []
-    texts = []
-    for part in parts:
-        mime = part.get('mimeType', '')
-        if mime == 'text/plain' and part.get('body', {}).get('data'):
-            texts.append(_get_text_from_part(part))
-        elif mime == 'text/html' and part.get('body', {}).get('data'):
-            html_txt = _get_text_from_part(part)
-            texts.append(BeautifulSoup(html_txt, "html.parser").get_text())
-        else:
-            # nested parts
-            subparts = part.get('parts') or []
-            for sp in subparts:
-                if sp.get('body', {}).get('data'):
-                    if sp.get('mimeType') == 'text/plain':
-                        texts.append(_get_text_from_part(sp))
-                    elif sp.get('mimeType') == 'text/html':
-                        html_txt = _get_text_from_part(sp)
-                        texts.append(BeautifulSoup(html_txt, "html.parser").get_text())
-    return "\n".join(texts).strip()
-
-def _collect_attachments(service, user_id, msg):
-    """
-    Return list of (filename, bytes) for attachments in the message.
-    """
-    attachments = []
-    payload = msg.get('payload', {})
-    parts = payload.get('parts') or []
-    for part in parts:
-        filename = part.get('filename')
-        body = part.get('body', {})
-        if filename and (body.get('attachmentId') or body.get('data')):
-            attachment_data = None
-            if body.get('attachmentId'):
-                att_id = body['attachmentId']
-                att = service.users().messages().attachments().get(userId=user_id, messageId=msg['id'], id=att_id).execute()
-                data = att.get('data')
-                if data:
-                    attachment_data = base64.urlsafe_b64decode(data.encode('utf-8'))
-            elif body.get('data'):
-                attachment_data = base64.urlsafe_b64decode(body['data'].encode('utf-8'))
-            if attachment_data is not None:
-                attachments.append((filename, attachment_data))
-        # nested parts
-        if part.get('parts'):
-            for sp in part.get('parts'):
-                fn = sp.get('filename')
-                b = sp.get('body', {})
-                if fn and (b.get('attachmentId') or b.get('data')):
-                    attachment_data = None
-                    if b.get('attachmentId'):
-                        att_id = b['attachmentId']
-                        att = service.users().messages().attachments().get(userId=user_id, messageId=msg['id'], id=att_id).execute()
-                        data = att.get('data')
-                        if data:
-                            attachment_data = base64.urlsafe_b64decode(data.encode('utf-8'))
-                    elif b.get('data'):
-                        attachment_data = base64.urlsafe_b64decode(b['data'].encode('utf-8'))
-                    if attachment_data is not None:
-                        attachments.append((fn, attachment_data))
-    return attachments
-
-def get_latest_email(token_path='token.json'):
-    """
-    Fetch the most recent email.
-    Returns: (sender, subject, body_text, attachments)
-      - attachments: list of (filename, bytes). Empty list if none.
-    """
-    service = _get_service(token_path)
-    res = service.users().messages().list(userId='me', maxResults=1).execute()
-    msgs = res.get('messages', [])
-    if not msgs:
-        return None
-
-    msg_id = msgs[0]['id']
-    msg = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
-
-    headers = msg.get('payload', {}).get('headers', [])
-    subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), "(No Subject)")
-    sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), "(Unknown Sender)")
-
-    body = _extract_body_from_payload(msg.get('payload', {}))
-    if not body:
-        # fallback to snippet
-        body = msg.get('snippet', '')
-
-    attachments = _collect_attachments(service, 'me', msg)
-
-    return sender, subject, body, attachments
+# read_gmail.py
+# Fetch latest Gmail message: (sender, subject, body_text, attachments)
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+import base64
+import httplib2
+import random
+import time
+from bs4 import BeautifulSoup, SoupStrainer
+from googleapiclient.errors import HttpError
+
+SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+
+# only build tree nodes for text-bearing tags; scripts/styles/head boilerplate
+# (often 30-60% of an HTML email) are skipped during the parse itself
+_BODY_STRAINER = SoupStrainer(["p", "div", "span", "a", "td", "li",
+                               "h1", "h2", "h3", "h4", "br", "body"])
+
+# lxml is the C-backed parser, several times faster than html.parser, but it
+# is not pinned in requirements.txt — fall back rather than raise
+# FeatureNotFound on every HTML email when it isn't installed
+try:
+    import lxml  # noqa: F401
+    _BS_PARSER = "lxml"
+except ImportError:
+    _BS_PARSER = "html.parser"
+
+_SERVICE_CACHE = {}  # token_path -> built service; build() costs 100-700 ms
+
+def _get_service(token_path='token.json'):
+    """
+    Load credentials from token.json (created by OAuth flow) and build Gmail service.
+    The built service is memoized per token path so repeated polls skip the
+    discovery fetch and client reflection after the first call.
+    """
+    service = _SERVICE_CACHE.get(token_path)
+    if service is None:
+        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+        # one shared httplib2.Http keeps the TCP+TLS connection alive across
+        # the list/get/attachment calls instead of re-handshaking per request
+        authed_http = AuthorizedHttp(creds, http=httplib2.Http())
+        service = build('gmail', 'v1', http=authed_http, cache_discovery=False)
+        _SERVICE_CACHE[token_path] = service
+    return service
+
+def _execute_with_retry(req, max_tries=5, base=0.5):
+    """Execute an API request, backing off exponentially on 429/5xx."""
+    for i in range(max_tries):
+        try:
+            return req.execute()
+        except HttpError as e:
+            status = getattr(e.resp, 'status', None)
+            if status not in (429, 500, 503) or i == max_tries - 1:
+                raise
+            time.sleep(base * (2 ** i) + random.random() * 0.1)
+
+def _get_text_from_part(part):
+    data = part.get('body', {}).get('data')
+    if not data:
+        return ''
+    # urlsafe_b64decode accepts str directly; .encode() would just copy the payload
+    text = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+    return text
+
+def _iter_parts(payload):
+    """Yield every MIME part of the payload tree once, in document order."""
+    stack = [payload]
+    while stack:
+        p = stack.pop()
+        yield p
+        stack.extend(reversed(p.get('parts') or ()))
+
+def _extract_body_from_payload(payload):
+    # Prefer a direct body; otherwise gather text parts across the whole tree
+    if payload.get('body', {}).get('data'):
+        return _get_text_from_part(payload)
+    texts = []
+    for part in _iter_parts(payload):
+        if part is payload or not part.get('body', {}).get('data'):
+            continue
+        mime = part.get('mimeType', '')
+        if mime == 'text/plain':
+            texts.append(_get_text_from_part(part))
+        elif mime == 'text/html':
+            html_txt = _get_text_from_part(part)
+            texts.append(BeautifulSoup(html_txt, _BS_PARSER, parse_only=_BODY_STRAINER).get_text(separator=" ", strip=True))
+    return "\n".join(texts).strip()
+
+def _collect_attachments(service, user_id, msg):
+    """
+    Return list of (filename, bytes) for attachments in the message.
+
+    Attachment downloads go through the Gmail batch endpoint, so a message
+    with N attachments costs one HTTP round-trip instead of N.
+    """
+    attachments = []
+    to_fetch = []  # (filename, attachmentId) needing a network fetch
+    for part in _iter_parts(msg.get('payload', {})):
+        filename = part.get('filename')
+        if not filename:
+            continue
+        body = part.get('body', {})
+        if body.get('attachmentId'):
+            to_fetch.append((filename, body['attachmentId']))
+        elif body.get('data'):
+            # inline data: already in the message, no fetch needed
+            attachments.append((filename, base64.urlsafe_b64decode(body['data'])))
+
+    if to_fetch:
+        fetched = {}
+
+        def _cb(request_id, response, exception):
+            if exception is None and response and response.get('data'):
+                fetched[request_id] = base64.urlsafe_b64decode(response['data'])
+
+        failed = []
+
+        def _cb_retry(request_id, response, exception):
+            if exception is not None:
+                failed.append(int(request_id))
+            else:
+                _cb(request_id, response, exception)
+
+        # Gmail caps batches at 100 inner requests
+        for start in range(0, len(to_fetch), 100):
+            batch = service.new_batch_http_request(callback=_cb_retry)
+            for j, (fn, att_id) in enumerate(to_fetch[start:start + 100], start=start):
+                batch.add(
+                    service.users().messages().attachments().get(
+                        userId=user_id, messageId=msg['id'], id=att_id),
+                    request_id=str(j))
+            _execute_with_retry(batch)
+        # retry per-request batch failures individually with backoff
+        for j in failed:
+            fn, att_id = to_fetch[j]
+            try:
+                att = _execute_with_retry(
+                    service.users().messages().attachments().get(
+                        userId=user_id, messageId=msg['id'], id=att_id))
+                if att and att.get('data'):
+                    fetched[str(j)] = base64.urlsafe_b64decode(att['data'])
+            except Exception:
+                pass
+        for j, (fn, att_id) in enumerate(to_fetch):
+            data = fetched.get(str(j))
+            if data is not None:
+                attachments.append((fn, data))
+    return attachments
+
+def get_latest_email(token_path='token.json'):
+    """
+    Fetch the most recent email.
+    Returns: (sender, subject, body_text, attachments)
+      - attachments: list of (filename, bytes). Empty list if none.
+    """
+    service = _get_service(token_path)
+    res = _execute_with_retry(service.users().messages().list(userId='me', maxResults=1, fields='messages/id'))
+    msgs = res.get('messages', [])
+    if not msgs:
+        return None
+
+    msg_id = msgs[0]['id']
+    # partial response: only the header/body/parts subtrees we actually read,
+    # dropping labelIds/historyId/sizeEstimate etc. from the wire. `parts` is
+    # requested unqualified so the server returns the full recursive MIME
+    # tree — a depth-limited selector would silently drop nested parts
+    # (e.g. mixed -> alternative -> related layouts)
+    fields = 'id,snippet,payload(headers(name,value),mimeType,body(data,attachmentId),parts)'
+    msg = _execute_with_retry(service.users().messages().get(
+        userId='me', id=msg_id, format='full', fields=fields))
+
+    headers = msg.get('payload', {}).get('headers', [])
+    # one pass over the headers instead of a full scan per field
+    hmap = {h['name'].lower(): h['value'] for h in headers}
+    subject = hmap.get('subject', "(No Subject)")
+    sender = hmap.get('from', "(Unknown Sender)")
+
+    body = _extract_body_from_payload(msg.get('payload', {}))
+    if not body:
+        # fallback to snippet
+        body = msg.get('snippet', '')
+
+    attachments = _collect_attachments(service, 'me', msg)
+
+    return sender, subject, body, attachments
@@ -0,0 +1,35 @@
+# redump_for_mmap.py
+"""
+Re-serialize the model artifacts uncompressed so mmap loading works.
+
+utils.py loads models with joblib's mmap_mode='r', but joblib silently
+ignores mmap for compressed archives (like the compress=3 files the
+trainers write) and falls back to a private in-heap copy per process.
+Running this once re-dumps each artifact in place with compress=0, after
+which every worker shares the same read-only pages of the weight arrays.
+
+Usage:
+    # from project root
+    python src/redump_for_mmap.py
+"""
+import os
+import joblib
+from pathlib import Path
+
+TARGETS = [
+    os.getenv("SPAM_MODEL_PATH", "models/spam_model_v2.joblib"),
+    "models/spam_model_v1.joblib",
+    "models/spam_model.pkl",
+    os.getenv("SOCIAL_MODEL_PATH", "models/social_model.pkl"),
+]
+
+for path in dict.fromkeys(TARGETS):
+    if not Path(path).exists():
+        print(f"⚠️ Skipping {path} (not found)")
+        continue
+    print(f"📦 Re-dumping {path} uncompressed for mmap")
+    model = joblib.load(path)
+    joblib.dump(model, path, compress=0)
+    print(f"💾 Rewrote {path}")
+
+print("Done.")
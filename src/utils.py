@@ -1,190 +1,608 @@
-# utils.py
-import os
-import joblib
-import requests
-import json
-import re
-from pathlib import Path
-
-# ---------------- Spam model ----------------
-MODEL_PATH = os.getenv("SPAM_MODEL_PATH", "models/spam_model_v2.joblib")
-if not Path(MODEL_PATH).exists():
-    if Path("models/spam_model.pkl").exists():
-        MODEL_PATH = "models/spam_model.pkl"
-
-try:
-    clf = joblib.load(MODEL_PATH)
-    print("Loaded spam classifier from:", MODEL_PATH)
-except Exception as e:
-    clf = None
-    print("⚠️ Could not load spam classifier:", e)
-
-def classify_email(subject, body):
-    if clf is None:
-        return "UNKNOWN"
-    text = f"{subject or ''} {body or ''}"
-    try:
-        pred = clf.predict([text])[0]
-        return "SPAM 🚨" if int(pred) == 1 else "HAM ✅"
-    except Exception as e:
-        return f"ERROR: {e}"
-
-# -------------- Social engineering model & heuristics --------------
-SOCIAL_MODEL_PATH = os.getenv("SOCIAL_MODEL_PATH", "models/social_model.pkl")
-SOCIAL_THRESHOLD_PATH = os.getenv("SOCIAL_THRESHOLD_PATH", "models/social_threshold.json")
-# Combined score weight: alpha * model_prob + (1-alpha) * rule_score
-COMBINE_ALPHA = float(os.getenv("SOCIAL_COMBINE_ALPHA", 0.7))
-
-try:
-    social_clf = joblib.load(SOCIAL_MODEL_PATH)
-    print("Loaded social engineering classifier from:", SOCIAL_MODEL_PATH)
-except Exception as e:
-    social_clf = None
-    print("⚠️ Could not load social engineering model:", e)
-
-# Default threshold changed to 0.45 (can be overridden by saved file or env var)
-DEFAULT_SOCIAL_THRESHOLD = 0.45
-
-# Try to load an auto-computed threshold (created by train_social.py).
-# If present, it will be used. If an env var SOCIAL_THRESHOLD is provided, that takes precedence.
-_loaded_threshold = None
-try:
-    if Path(SOCIAL_THRESHOLD_PATH).exists():
-        with open(SOCIAL_THRESHOLD_PATH, "r") as f:
-            _loaded_threshold = float(json.load(f)["threshold"])
-        print("Loaded saved social engineering threshold from file:", _loaded_threshold)
-except Exception:
-    _loaded_threshold = None
-
-# If env var set, it overrides the loaded threshold.
-_env_thresh = os.getenv("SOCIAL_THRESHOLD")
-if _env_thresh is not None:
-    try:
-        SOCIAL_THRESHOLD = float(_env_thresh)
-        print("Using SOCIAL_THRESHOLD from environment:", SOCIAL_THRESHOLD)
-    except Exception:
-        SOCIAL_THRESHOLD = _loaded_threshold if _loaded_threshold is not None else DEFAULT_SOCIAL_THRESHOLD
-        print("Invalid SOCIAL_THRESHOLD env var; falling back to:", SOCIAL_THRESHOLD)
-else:
-    SOCIAL_THRESHOLD = _loaded_threshold if _loaded_threshold is not None else DEFAULT_SOCIAL_THRESHOLD
-    print("Using social engineering threshold:", SOCIAL_THRESHOLD)
-
-# ----- Rule-based indicators -----
-RULE_INDICATORS = {
-    "layoff_terms": {
-        "pattern": re.compile(r"\b(layoff|layoffs|downsiz|downsizings|firing|fired|laid off|we may let|we may be letting|position is at risk)\b", re.I),
-        "weight": 2.5,
-        "description": "Layoff / job insecurity phrasing"
-    },
-    "cred_request": {
-        "pattern": re.compile(r"\b(password|credentials|login|ssn|social security|bank details|account number|confirm your identity|verify your identity|verify your account|confirm your details)\b", re.I),
-        "weight": 2.0,
-        "description": "Request for credentials / personal info"
-    },
-    "urgency": {
-        "pattern": re.compile(r"\b(urgent|immediately|right now|asap|today|this minute|immediate action|required now|must)\b", re.I),
-        "weight": 1.2,
-        "description": "Urgency pressure"
-    },
-    "emotional_appeal": {
-        "pattern": re.compile(r"\b(so upset|devastated|terrible news|shocking|can't believe|sorry to hear|must be hard|feeling stressed|worried about)\b", re.I),
-        "weight": 1.3,
-        "description": "Emotional appeal / sympathy"
-    },
-    "reward": {
-        "pattern": re.compile(r"\b(congratulations|you've won|exclusive offer|selected for|prize|claim your reward|pre-approved)\b", re.I),
-        "weight": 1.6,
-        "description": "Reward / prize lure"
-    },
-    "impersonation": {
-        "pattern": re.compile(r"\b(i'm (from|with) |this is .* from|on behalf of|im from)\b", re.I),
-        "weight": 1.0,
-        "description": "Impersonation / sender claim"
-    },
-    "link_indicator": {
-        "pattern": re.compile(r"https?://", re.I),
-        "weight": 0.8,
-        "description": "Presence of (possibly malicious) links"
-    }
-}
-
-_MAX_RULE_SCORE = sum(ind["weight"] for ind in RULE_INDICATORS.values())
-
-def rule_score_and_triggers(text):
-    if not text:
-        return 0.0, []
-    total = 0.0
-    triggers = []
-    for key, ind in RULE_INDICATORS.items():
-        if ind["pattern"].search(text):
-            total += ind["weight"]
-            triggers.append(ind["description"])
-    normalized = min(1.0, total / _MAX_RULE_SCORE) if _MAX_RULE_SCORE > 0 else 0.0
-    return normalized, list(set(triggers))
-
-def model_social_prob(text):
-    if social_clf is None:
-        return None
-    try:
-        prob = social_clf.predict_proba([text])[0][1]
-        return float(prob)
-    except Exception:
-        return None
-
-def classify_social_combined(text):
-    txt = text or ""
-    model_prob = model_social_prob(txt)
-    rscore, triggers = rule_score_and_triggers(txt)
-
-    if model_prob is None:
-        combined = rscore
-    else:
-        combined = COMBINE_ALPHA * model_prob + (1.0 - COMBINE_ALPHA) * rscore
-
-    combined = max(0.0, min(1.0, float(combined)))
-
-    try:
-        label = "Attack 🎭" if combined >= SOCIAL_THRESHOLD else "No Attack 🙂"
-    except Exception:
-        label = "ERROR"
-
-    return {
-        "model_prob": model_prob,
-        "rule_score": float(rscore),
-        "combined_prob": float(combined),
-        "threshold": float(SOCIAL_THRESHOLD),
-        "label": label,
-        "triggers": triggers
-    }
-
-# ---------------- Google Safe Browsing (original auth style) ----------------
-def scan_url_google(url):
-    api_key = os.getenv("GOOGLE_SAFE_BROWSING_KEY")
-    if not api_key:
-        return {"error": "GOOGLE_SAFE_BROWSING_KEY not set"}
-
-    endpoint = f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={api_key}"
-    payload = {
-        "client": {"clientId": "phishnet", "clientVersion": "1.0"},
-        "threatInfo": {
-            "threatTypes": [
-                "MALWARE",
-                "SOCIAL_ENGINEERING",
-                "UNWANTED_SOFTWARE",
-                "POTENTIALLY_HARMFUL_APPLICATION",
-            ],
-            "platformTypes": ["ANY_PLATFORM"],
-            "threatEntryTypes": ["URL"],
-            "threatEntries": [{"url": url}],
-        },
-    }
-
-    try:
-        r = requests.post(endpoint, json=payload, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        if "matches" in data:
-            return {"url": url, "status": "unsafe", "matches": data["matches"]}
-        return {"url": url, "status": "safe"}
-    except Exception as e:
-        return {"error": str(e)}
+# utils.py
+import os
+import asyncio
+import joblib
+import logging
+import requests
+import json
+import re
+import struct
+import time
+from collections import defaultdict
+from functools import cache, lru_cache
+from pathlib import Path
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger(__name__)
+
+# orjson (Rust, SIMD-accelerated) for API payload (de)serialization when
+# installed; both helpers deal in bytes
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = lambda o: json.dumps(o, separators=(",", ":")).encode()
+    _json_loads = json.loads
+
+# httpx powers the optional async Safe Browsing path; the sync session
+# remains the default transport
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# ---------------- Spam model ----------------
+MODEL_PATH = os.getenv("SPAM_MODEL_PATH", "models/spam_model_v2.joblib")
+if not Path(MODEL_PATH).exists():
+    if Path("models/spam_model.pkl").exists():
+        MODEL_PATH = "models/spam_model.pkl"
+
+# ---------------- optional ONNX runtime inference ----------------
+# src/export_onnx.py converts the sklearn pipelines; when onnxruntime and an
+# exported model are present, inference runs as one C-level call (and releases
+# the GIL) instead of going through sklearn's Python pipeline dispatch
+SPAM_ONNX_PATH = os.getenv("SPAM_ONNX_PATH", "models/spam_model.onnx")
+SOCIAL_ONNX_PATH = os.getenv("SOCIAL_ONNX_PATH", "models/social_model.onnx")
+
+import numpy as _np
+
+try:
+    import onnxruntime as _ort
+except ImportError:
+    _ort = None
+
+@cache
+def _get_onnx_session(path):
+    if _ort is None or not Path(path).exists():
+        return None
+    try:
+        sess = _ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        log.info("Loaded ONNX model from: %s", path)
+        return sess
+    except Exception as e:
+        log.warning("Could not load ONNX model: %s", e)
+        return None
+
+@cache
+def _get_spam_clf():
+    # loaded on first classification, not at import: URL-only callers of
+    # utils never pay the sklearn/model deserialization cost
+    try:
+        # mmap keeps the model's numpy arrays file-backed; only the pages
+        # that prediction actually touches get read into memory, and under
+        # multi-process servers the read-only pages are shared across workers
+        model = joblib.load(MODEL_PATH, mmap_mode="r")
+        log.info("Loaded spam classifier from: %s", MODEL_PATH)
+        return model
+    except Exception as e:
+        log.warning("Could not load spam classifier: %s", e)
+        return None
+
+def classify_emails(pairs):
+    """Batch-classify [(subject, body), ...] with a single predict call,
+    so the vectorizer's tokenization setup and the sparse matmul are paid
+    once per batch instead of once per email."""
+    texts = [f"{s or ''} {b or ''}" for s, b in pairs]
+    sess = _get_onnx_session(SPAM_ONNX_PATH)
+    if sess is not None:
+        try:
+            preds = sess.run(None, {sess.get_inputs()[0].name: _np.array(texts)})[0]
+            return ["SPAM 🚨" if int(p) == 1 else "HAM ✅" for p in preds]
+        except Exception:
+            pass  # fall back to the sklearn pipeline
+    clf = _get_spam_clf()
+    if clf is None:
+        return ["UNKNOWN"] * len(pairs)
+    try:
+        preds = clf.predict(texts)
+        return ["SPAM 🚨" if int(p) == 1 else "HAM ✅" for p in preds]
+    except Exception as e:
+        return [f"ERROR: {e}"] * len(pairs)
+
+@cache
+def _spam_steps():
+    """Split the spam pipeline into (vectorizer, estimator) when possible,
+    so the transform and the predict can be driven (and cached) separately."""
+    clf = _get_spam_clf()
+    try:
+        if clf is not None and len(clf.steps) >= 2:
+            return clf.steps[0][1], clf.steps[-1][1]
+    except Exception:
+        pass
+    return None
+
+@lru_cache(maxsize=4096)
+def _spam_row_cached(text_hash, text):
+    # the tokenize+hash transform is the expensive half of the pipeline;
+    # cache the sparse row so repeated bodies skip it even after the label
+    # cache has evicted
+    vec, _ = _spam_steps()
+    return vec.transform([text])
+
+@lru_cache(maxsize=4096)
+def _classify_email_cached(text_hash, text):
+    steps = _spam_steps()
+    if steps is not None:
+        try:
+            row = _spam_row_cached(text_hash, text)
+            est = steps[1]
+            decide = getattr(est, "decision_function", None)
+            if decide is not None:
+                # the sign of the raw linear score is the label; skip
+                # predict's sigmoid/argmax packaging entirely
+                return "SPAM 🚨" if decide(row)[0] > 0 else "HAM ✅"
+            pred = est.predict(row)[0]
+            return "SPAM 🚨" if int(pred) == 1 else "HAM ✅"
+        except Exception:
+            pass
+    return classify_emails([("", text)])[0]
+
+def classify_email(subject, body):
+    # classification is a pure function of the text, and the same message is
+    # often re-classified (Streamlit reruns, refetches) — memoize on its hash
+    text = f"{subject or ''} {body or ''}"
+    return _classify_email_cached(hash(text), text)
+
+# -------------- Social engineering model & heuristics --------------
+SOCIAL_MODEL_PATH = os.getenv("SOCIAL_MODEL_PATH", "models/social_model.pkl")
+SOCIAL_THRESHOLD_PATH = os.getenv("SOCIAL_THRESHOLD_PATH", "models/social_threshold.json")
+# preferred compact artifact: 4-byte little-endian float (see train_social.py)
+SOCIAL_THRESHOLD_BIN_PATH = os.getenv("SOCIAL_THRESHOLD_BIN_PATH", "models/social_threshold.bin")
+# Combined score weight: alpha * model_prob + (1-alpha) * rule_score
+COMBINE_ALPHA = float(os.getenv("SOCIAL_COMBINE_ALPHA", 0.7))
+
+@cache
+def _get_social_clf():
+    try:
+        model = joblib.load(SOCIAL_MODEL_PATH, mmap_mode="r")
+        log.info("Loaded social engineering classifier from: %s", SOCIAL_MODEL_PATH)
+        return model
+    except Exception as e:
+        log.warning("Could not load social engineering model: %s", e)
+        return None
+
+# Default threshold changed to 0.45 (can be overridden by saved file or env var)
+DEFAULT_SOCIAL_THRESHOLD = 0.45
+
+# Try to load an auto-computed threshold (created by train_social.py).
+# If present, it will be used. If an env var SOCIAL_THRESHOLD is provided, that takes precedence.
+_loaded_threshold = None
+try:
+    if Path(SOCIAL_THRESHOLD_BIN_PATH).exists():
+        # single packed float: no JSON state machine on the import path
+        with open(SOCIAL_THRESHOLD_BIN_PATH, "rb") as f:
+            _loaded_threshold = struct.unpack("<f", f.read(4))[0]
+        log.info("Loaded saved social engineering threshold from file: %s", _loaded_threshold)
+    elif Path(SOCIAL_THRESHOLD_PATH).exists():
+        # legacy JSON artifact from older train_social.py runs
+        with open(SOCIAL_THRESHOLD_PATH, "r") as f:
+            _loaded_threshold = float(json.load(f)["threshold"])
+        log.info("Loaded saved social engineering threshold from file: %s", _loaded_threshold)
+except Exception:
+    _loaded_threshold = None
+
+# If env var set, it overrides the loaded threshold.
+_env_thresh = os.getenv("SOCIAL_THRESHOLD")
+if _env_thresh is not None:
+    try:
+        SOCIAL_THRESHOLD = float(_env_thresh)
+        log.info("Using SOCIAL_THRESHOLD from environment: %s", SOCIAL_THRESHOLD)
+    except Exception:
+        SOCIAL_THRESHOLD = _loaded_threshold if _loaded_threshold is not None else DEFAULT_SOCIAL_THRESHOLD
+        log.warning("Invalid SOCIAL_THRESHOLD env var; falling back to: %s", SOCIAL_THRESHOLD)
+else:
+    SOCIAL_THRESHOLD = _loaded_threshold if _loaded_threshold is not None else DEFAULT_SOCIAL_THRESHOLD
+    log.info("Using social engineering threshold: %s", SOCIAL_THRESHOLD)
+
+# ----- Rule-based indicators -----
+RULE_INDICATORS = {
+    "layoff_terms": {
+        "pattern": re.compile(r"\b(layoff|layoffs|downsiz|downsizings|firing|fired|laid off|we may let|we may be letting|position is at risk)\b", re.I),
+        "weight": 2.5,
+        "description": "Layoff / job insecurity phrasing"
+    },
+    "cred_request": {
+        # shared prefixes factored so the compiled NFA has fewer states
+        "pattern": re.compile(r"\b(password|credentials|login|ssn|social security|bank details|account number|confirm your (?:identity|details)|verify your (?:identity|account))\b", re.I),
+        "weight": 2.0,
+        "description": "Request for credentials / personal info"
+    },
+    "urgency": {
+        "pattern": re.compile(r"\b(urgent|immediately|right now|asap|today|this minute|immediate action|required now|must)\b", re.I),
+        "weight": 1.2,
+        "description": "Urgency pressure"
+    },
+    "emotional_appeal": {
+        "pattern": re.compile(r"\b(so upset|devastated|terrible news|shocking|can't believe|sorry to hear|must be hard|feeling stressed|worried about)\b", re.I),
+        "weight": 1.3,
+        "description": "Emotional appeal / sympathy"
+    },
+    "reward": {
+        "pattern": re.compile(r"\b(congratulations|you've won|exclusive offer|selected for|prize|claim your reward|pre-approved)\b", re.I),
+        "weight": 1.6,
+        "description": "Reward / prize lure"
+    },
+    "impersonation": {
+        "pattern": re.compile(r"\b(i'm (from|with) |this is .* from|on behalf of|im from)\b", re.I),
+        "weight": 1.0,
+        "description": "Impersonation / sender claim"
+    },
+    "link_indicator": {
+        "pattern": re.compile(r"https?://", re.I),
+        "weight": 0.8,
+        "description": "Presence of (possibly malicious) links"
+    }
+}
+
+_MAX_RULE_SCORE = sum(ind["weight"] for ind in RULE_INDICATORS.values())
+
+# RE2 matches in guaranteed linear time (no backtracking blowups on
+# adversarial bodies); its Python binding mirrors the re API, so it slots
+# straight into the fused pattern below when installed
+try:
+    import re2 as _rules_re
+except ImportError:
+    _rules_re = re
+
+def _compile_rule(pattern):
+    try:
+        return _rules_re.compile(pattern)
+    except Exception:
+        # re2 rejects some constructs stdlib re accepts; keep the stdlib engine
+        return re.compile(pattern)
+
+# per-rule patterns compiled without IGNORECASE: the scorer lowercases its
+# input once, which keeps the engine's literal fast paths enabled (all rule
+# literals are already lowercase). Each rule is searched independently with
+# search() — first hit per rule, no full finditer sweep — because a fused
+# alternation lets an earlier rule's match consume text an overlapping rule
+# needs (e.g. urgency's "must" shadowing emotional_appeal's "must be hard").
+
+# SoA layout for the hot loop: parallel tuples/arrays indexed by rule id,
+# so per-match work is integer indexing instead of nested dict lookups
+_RULE_KEYS = tuple(RULE_INDICATORS)
+_RULE_ID = {key: i for i, key in enumerate(_RULE_KEYS)}
+_RULE_DESCS = tuple(RULE_INDICATORS[key]["description"] for key in _RULE_KEYS)
+_WEIGHTS_ARR = _np.array([RULE_INDICATORS[key]["weight"] for key in _RULE_KEYS])
+_RULE_PATTERNS = tuple(_compile_rule(RULE_INDICATORS[key]["pattern"].pattern)
+                       for key in _RULE_KEYS)
+
+# ----- optional Aho-Corasick fast path for the literal phrase rules -----
+# most indicators are plain phrase lists; an AC automaton matches all of
+# them in one C-level pass. Only the genuinely regex-shaped rules
+# (impersonation, link_indicator) stay on a small residual pattern.
+_RULE_LITERALS = {
+    "layoff_terms": ("layoff", "layoffs", "downsiz", "downsizings", "firing",
+                     "fired", "laid off", "we may let", "we may be letting",
+                     "position is at risk"),
+    "cred_request": ("password", "credentials", "login", "ssn",
+                     "social security", "bank details", "account number",
+                     "confirm your identity", "confirm your details",
+                     "verify your identity", "verify your account"),
+    "urgency": ("urgent", "immediately", "right now", "asap", "today",
+                "this minute", "immediate action", "required now", "must"),
+    "emotional_appeal": ("so upset", "devastated", "terrible news", "shocking",
+                         "can't believe", "sorry to hear", "must be hard",
+                         "feeling stressed", "worried about"),
+    "reward": ("congratulations", "you've won", "exclusive offer",
+               "selected for", "prize", "claim your reward", "pre-approved"),
+}
+
+# the genuinely regex-shaped rules the automaton can't cover, checked
+# individually so one rule's match can never shadow the other's
+_RESIDUAL_IDS = tuple(_RULE_ID[key] for key in ("impersonation", "link_indicator"))
+
+try:
+    import ahocorasick
+    _RULE_AUTOMATON = ahocorasick.Automaton()
+    for _key, _words in _RULE_LITERALS.items():
+        for _w in _words:
+            # payload carries the integer rule id so the scan loop never
+            # touches a dict
+            _RULE_AUTOMATON.add_word(_w, (_RULE_ID[_key], _w))
+    _RULE_AUTOMATON.make_automaton()
+except ImportError:
+    _RULE_AUTOMATON = None
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+# optional numba kernel for the dedupe-and-accumulate over matched rule ids;
+# warmed at import so the first real request doesn't pay JIT compilation
+try:
+    from numba import njit as _njit
+
+    @_njit(cache=True)
+    def _score_ids(ids, weights):
+        seen = _np.zeros(weights.size, dtype=_np.bool_)
+        total = 0.0
+        for i in ids:
+            if not seen[i]:
+                seen[i] = True
+                total += weights[i]
+        return total, seen
+
+    _score_ids(_np.zeros(1, dtype=_np.int64), _WEIGHTS_ARR)
+except Exception:
+    _score_ids = None
+
+def _rule_score_lowered(text):
+    # `text` must already be lowercased; see rule_score_and_triggers
+    ids = []
+    if _RULE_AUTOMATON is not None:
+        n = len(text)
+        for end, (rid, word) in _RULE_AUTOMATON.iter(text):
+            # enforce the \b boundaries the regex rules had
+            start = end - len(word) + 1
+            if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(word[0]):
+                continue
+            if end + 1 < n and _is_word_char(text[end + 1]) and _is_word_char(word[-1]):
+                continue
+            ids.append(rid)
+        for rid in _RESIDUAL_IDS:
+            if _RULE_PATTERNS[rid].search(text):
+                ids.append(rid)
+    else:
+        for rid, pat in enumerate(_RULE_PATTERNS):
+            if pat.search(text):
+                ids.append(rid)
+    if not ids:
+        return 0.0, []
+    if _score_ids is not None:
+        total, seen_mask = _score_ids(_np.asarray(ids, dtype=_np.int64), _WEIGHTS_ARR)
+        fired = [i for i in range(len(_RULE_KEYS)) if seen_mask[i]]
+    else:
+        seen = set()
+        total = 0.0
+        for i in ids:
+            if i not in seen:
+                seen.add(i)
+                total += _WEIGHTS_ARR[i]
+        fired = sorted(seen)
+    normalized = min(1.0, total / _MAX_RULE_SCORE) if _MAX_RULE_SCORE > 0 else 0.0
+    # `fired` is already unique and in rule-declaration order (stable for the
+    # UI); no list(set(...)) post-pass needed
+    return normalized, [_RULE_DESCS[i] for i in fired]
+
+def rule_score_and_triggers(text):
+    if not text:
+        return 0.0, []
+    # one case-fold pass instead of re.I per alternative
+    return _rule_score_lowered(text.lower())
+
+def model_social_probs(texts):
+    """Batch predict_proba: one TF-IDF transform for the whole list."""
+    sess = _get_onnx_session(SOCIAL_ONNX_PATH)
+    if sess is not None:
+        try:
+            out = sess.run(None, {sess.get_inputs()[0].name: _np.array(texts)})
+            probs = out[1]
+            if isinstance(probs, list):
+                # skl2onnx's default ZipMap output: one {label: prob} per row
+                return [float(d.get(1, d.get("1", 0.0))) for d in probs]
+            return [float(p[1]) for p in probs]
+        except Exception:
+            pass  # fall back to the sklearn pipeline
+    social_clf = _get_social_clf()
+    if social_clf is None:
+        return [None] * len(texts)
+    try:
+        probs = social_clf.predict_proba(texts)[:, 1]
+        return [float(p) for p in probs]
+    except Exception:
+        return [None] * len(texts)
+
+def model_social_prob(text):
+    return model_social_probs([text])[0]
+
+def _finish_social(model_prob, rscore, combined, triggers):
+    combined = max(0.0, min(1.0, float(combined)))
+
+    try:
+        label = "Attack 🎭" if combined >= SOCIAL_THRESHOLD else "No Attack 🙂"
+    except Exception:
+        label = "ERROR"
+
+    return {
+        "model_prob": model_prob,
+        "rule_score": float(rscore),
+        "combined_prob": float(combined),
+        "threshold": float(SOCIAL_THRESHOLD),
+        "label": label,
+        "triggers": triggers
+    }
+
+def _combine_social(txt, model_prob):
+    # txt arrives lowercased from the classify_* entry points, so the rule
+    # scan and the (lowercase=True, idempotent) TF-IDF share one case fold
+    rscore, triggers = _rule_score_lowered(txt) if txt else (0.0, [])
+
+    if model_prob is None:
+        combined = rscore
+    else:
+        combined = COMBINE_ALPHA * model_prob + (1.0 - COMBINE_ALPHA) * rscore
+
+    return _finish_social(model_prob, rscore, combined, triggers)
+
+def classify_socials(texts):
+    """Batch version of classify_social_combined: one predict_proba call
+    for the whole list, then the rule scorer in a tight loop per row."""
+    txts = [(t or "").lower() for t in texts]
+    probs = model_social_probs(txts)
+    return [_combine_social(t, p) for t, p in zip(txts, probs)]
+
+# batch-API aliases matching the *_batch naming some callers expect
+classify_emails_batch = classify_emails
+classify_social_combined_batch = classify_socials
+
+@lru_cache(maxsize=4096)
+def _classify_social_cached(text_hash, text):
+    rscore, triggers = _rule_score_lowered(text) if text else (0.0, [])
+    # model_prob is bounded to [0,1], so the combined score can only land in
+    # [(1-a)*rscore, a + (1-a)*rscore]; when that whole interval sits on one
+    # side of the threshold the verdict is already decided and the TF-IDF +
+    # predict_proba call can be skipped
+    lo = (1.0 - COMBINE_ALPHA) * rscore
+    hi = COMBINE_ALPHA + (1.0 - COMBINE_ALPHA) * rscore
+    if lo >= SOCIAL_THRESHOLD:
+        return _finish_social(None, rscore, lo, triggers)
+    if hi < SOCIAL_THRESHOLD:
+        return _finish_social(None, rscore, hi, triggers)
+    model_prob = model_social_prob(text)
+    if model_prob is None:
+        combined = rscore
+    else:
+        combined = COMBINE_ALPHA * model_prob + (1.0 - COMBINE_ALPHA) * rscore
+    return _finish_social(model_prob, rscore, combined, triggers)
+
+def classify_social_combined(text):
+    # lowercase up front: shared by the rule scan and the vectorizer, and it
+    # also folds case-variant duplicates onto one cache entry
+    txt = (text or "").lower()
+    # copy (including the triggers list — a shallow dict copy would still
+    # share it) so callers mutating the result can't poison the cache entry
+    cached = _classify_social_cached(hash(txt), txt)
+    return {**cached, "triggers": list(cached["triggers"])}
+
+# ---------------- Local URL prefilter (allowlist / blocklist) ----------------
+ALLOWLIST_PATH = os.getenv("URL_ALLOWLIST_PATH", "allowlist.txt")
+BLOCKLIST_PATH = os.getenv("URL_BLOCKLIST_PATH", "blocklist.txt")
+
+def _load_domain_list(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return frozenset(
+                line.strip().lower() for line in f
+                if line.strip() and not line.startswith("#")
+            )
+    except OSError:
+        return frozenset()
+
+# frozensets: membership check is O(1) per candidate suffix
+ALLOW_DOMAINS = _load_domain_list(ALLOWLIST_PATH)
+BLOCK_DOMAINS = _load_domain_list(BLOCKLIST_PATH)
+
+def prefilter_url(url):
+    """
+    Check a URL's host (and each parent domain) against the local
+    blocklist/allowlist. Returns "Malicious", "Safe", or None when the
+    domain is unknown and needs a real scan. Blocklist wins over allowlist.
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    if not host:
+        return None
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        suf = ".".join(parts[i:])
+        if suf in BLOCK_DOMAINS:
+            return "Malicious"
+        if suf in ALLOW_DOMAINS:
+            return "Safe"
+    return None
+
+# ---------------- Google Safe Browsing (original auth style) ----------------
+# one pooled session so repeated lookups reuse the TLS connection; transient
+# failures retry at the transport layer with a short backoff
+_GSB_SESSION = requests.Session()
+_GSB_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=32,
+    # allowed_methods=None: urllib3's default excludes POST, and every
+    # Safe Browsing call is a POST (idempotent lookup, safe to retry)
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 503),
+                      allowed_methods=None),
+))
+
+def _gsb_payload(urls):
+    return {
+        "client": {"clientId": "phishnet", "clientVersion": "1.0"},
+        "threatInfo": {
+            "threatTypes": [
+                "MALWARE",
+                "SOCIAL_ENGINEERING",
+                "UNWANTED_SOFTWARE",
+                "POTENTIALLY_HARMFUL_APPLICATION",
+            ],
+            "platformTypes": ["ANY_PLATFORM"],
+            "threatEntryTypes": ["URL"],
+            "threatEntries": [{"url": u} for u in urls],
+        },
+    }
+
+def _gsb_demux(urls, data):
+    matches_by_url = defaultdict(list)
+    for m in data.get("matches", []):
+        matches_by_url[(m.get("threat") or {}).get("url")].append(m)
+    return {
+        u: ({"url": u, "status": "unsafe", "matches": matches_by_url[u]}
+            if u in matches_by_url else {"url": u, "status": "safe"})
+        for u in urls
+    }
+
+def _gsb_post(urls):
+    """POST all `urls` in one threatMatches:find call; returns {url: result}."""
+    api_key = os.getenv("GOOGLE_SAFE_BROWSING_KEY")
+    if not api_key:
+        return {u: {"error": "GOOGLE_SAFE_BROWSING_KEY not set"} for u in urls}
+
+    endpoint = f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={api_key}"
+    try:
+        r = _GSB_SESSION.post(endpoint, data=_json_dumps(_gsb_payload(urls)),
+                              headers={"Content-Type": "application/json"}, timeout=10)
+        r.raise_for_status()
+        return _gsb_demux(urls, _json_loads(r.content))
+    except Exception as e:
+        return {u: {"error": str(e)} for u in urls}
+
+def scan_urls_google(urls):
+    """Check many URLs against Safe Browsing in a single request."""
+    if not urls:
+        return {}
+    return _gsb_post(tuple(dict.fromkeys(urls)))
+
+# (url, hour) -> successful verdict; the hour in the key expires entries
+# hourly. A plain dict (not lru_cache) so failed lookups are simply never
+# inserted instead of needing a cache-wide clear to evict.
+_GSB_URL_CACHE = {}
+_GSB_URL_CACHE_MAX = 4096
+
+async def scan_urls_google_async(urls):
+    """Async Safe Browsing check so callers can overlap the network wait
+    with model inference instead of blocking on the full round-trip."""
+    if not urls:
+        return {}
+    urls = tuple(dict.fromkeys(urls))
+    if httpx is None:
+        # no httpx installed: run the pooled sync path off the event loop
+        return await asyncio.to_thread(scan_urls_google, urls)
+    api_key = os.getenv("GOOGLE_SAFE_BROWSING_KEY")
+    if not api_key:
+        return {u: {"error": "GOOGLE_SAFE_BROWSING_KEY not set"} for u in urls}
+    endpoint = f"https://safebrowsing.googleapis.com/v4/threatMatches:find?key={api_key}"
+    try:
+        # client scoped to this call: a module-global client would carry its
+        # pooled connections into the next asyncio.run() loop and fail there
+        async with httpx.AsyncClient(
+                timeout=10, limits=httpx.Limits(max_connections=64)) as client:
+            r = await client.post(
+                endpoint, content=_json_dumps(_gsb_payload(urls)),
+                headers={"Content-Type": "application/json"})
+            r.raise_for_status()
+            return _gsb_demux(urls, _json_loads(r.content))
+    except Exception as e:
+        return {u: {"error": str(e)} for u in urls}
+
+def scan_url_google(url):
+    key = (url, int(time.time() // 3600))
+    result = _GSB_URL_CACHE.get(key)
+    if result is None:
+        result = _gsb_post((url,))[url]
+        # only successes are cached, so a transient failure retries on the
+        # next call without touching anyone else's good verdicts
+        if not result.get("error"):
+            if len(_GSB_URL_CACHE) >= _GSB_URL_CACHE_MAX:
+                _GSB_URL_CACHE.clear()
+            _GSB_URL_CACHE[key] = result
+    return result